@@ -1,34 +1,158 @@
-import csv
-import random
+import io
 import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, the split search falls back to plain NumPy
+    njit = None
+
+LABELS = ['red', 'light blue', 'medium blue', 'wicked blue']  # in order, used to count "almost" right
+L2I = {label: i for i, label in enumerate(LABELS)}  # class label -> index into LABELS
+
+PARALLEL_MIN_EXAMPLES = 10000  # smaller nodes scan attributes serially, threads would cost more
+MIN_GAIN = 1e-12  # smaller information gains are rounding noise (e.g. when splitting a pure node)
 
 
 def read_data(csv_path):
     """Read in the training data from a csv file.
 
-    The examples are returned as a list of Python dictionaries, with column names as keys.
+    The examples are returned as a pandas DataFrame with one column per csv column, parsed by
+    pandas' C reader from a memory-mapped file.  Numeric columns are stored as float32 (missing
+    values become nan), all other columns as strings.
     """
-    examples = []
-    with open(csv_path, 'r') as csv_file:
-        csv_reader = csv.DictReader(csv_file)
-        for example in csv_reader:
-            for k, v in example.items():
-                if v == '':
-                    example[k] = None
-                else:
-                    try:
-                        example[k] = float(v)
-                    except ValueError:
-                        example[k] = v
-            examples.append(example)
+    examples = pd.read_csv(csv_path, memory_map=True)
+    numeric = examples.select_dtypes('number').columns
+    examples[numeric] = examples[numeric].astype(np.float32)
     return examples
 
 
-def train_test_split(examples, test_perc):
-    """Randomly data set (a list of examples) into a training and test set."""
+def train_test_split(examples, test_perc, seed=None):
+    """Randomly data set (a DataFrame of examples) into a training and test set.
+
+    Only a permutation of row positions is shuffled; pass seed for a reproducible split.
+    """
     test_size = round(test_perc * len(examples))
-    shuffled = random.sample(examples, len(examples))
-    return shuffled[test_size:], shuffled[:test_size]
+    perm = np.random.default_rng(seed).permutation(len(examples))
+    return examples.iloc[perm[test_size:]], examples.iloc[perm[:test_size]]
+
+
+def entropy(counts, totals):
+    """Entropy (in bits) of each row of a (num_splits, num_classes) array of class counts.
+
+    Uses p * log2(p) = (c / T) * (log2(c) - log2(T)), so the sum over a row reduces to
+    log2(T) - sum(c * log2(c)) / T with 0 * log2(0) taken as 0.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        clogc = np.where(counts > 0, counts * np.log2(counts), 0.0)
+    return np.log2(totals) - clogc.sum(axis=1) / totals
+
+
+def make_node_entropy(n_classes):
+    """Generate the entropy (in bits) function for a single list of n_classes class counts.
+
+    The returned node_entropy(counts, total) is built with exec as one straight-line expression
+    over the unpacked counts, so no loop or generator runs per call.  Plain Python with math.log2
+    is cheaper than a NumPy call for a handful of classes.
+    """
+    names = ["c{}".format(i) for i in range(n_classes)]
+    src = ("def node_entropy(counts, total):\n"
+           "    {}, = counts\n"
+           "    return log2(total) - ({}) / total\n").format(
+        ", ".join(names), " + ".join("({0} * log2({0}) if {0} else 0.0)".format(c) for c in names))
+    namespace = {'log2': math.log2}
+    exec(src, namespace)
+    return namespace['node_entropy']
+
+
+def _best_split_numpy(sc, sy, n_classes, min_leaf, entropy_parent):
+    """Find the split of one attribute column with the highest information gain.
+
+    Args:
+        sc: float values of the attribute, sorted ascending (no missing values)
+        sy: int label index of each value in sc
+        n_classes: number of class labels
+        min_leaf: both sides of a split must hold at least this many examples
+        entropy_parent: entropy of the node being split
+
+    Returns: a tuple (gain, threshold), or (0.0, nan) if no split gains more than MIN_GAIN.  The
+        threshold is a float32 value so that comparing it with float32 data gives the same
+        answer whether the comparison is done in float32 or float64.
+    """
+    # only split between distinct values, and keep the minimum leaf count on both sides
+    n = len(sc)
+    bounds = np.flatnonzero(np.diff(sc) > 0)
+    bounds = bounds[(bounds + 1 >= min_leaf) & (n - 1 - bounds >= min_leaf)]
+    if len(bounds) == 0:
+        return 0.0, np.nan
+
+    # one-hot labels summed down the sorted column, in place: row i holds the class counts of
+    # the i + 1 smallest values, so the left counts of every split come from a single cumsum
+    cum = np.zeros((n, n_classes), dtype=np.int32)
+    cum[np.arange(n), sy] = 1
+    np.cumsum(cum, axis=0, out=cum)
+    l = cum[bounds]
+    r = cum[-1] - l
+    p_l = bounds + 1
+    p_r = n - p_l
+    gain = entropy_parent - (p_l * entropy(l, p_l) + p_r * entropy(r, p_r)) / n
+
+    j = int(np.argmax(gain))
+    if gain[j] <= MIN_GAIN:
+        return 0.0, np.nan
+    i = bounds[j]
+    thres = np.float32((float(sc[i]) + float(sc[i + 1])) / 2)
+    if thres <= sc[i]:  # no float32 strictly between the two values
+        thres = sc[i + 1]
+    return float(gain[j]), float(thres)
+
+
+def _best_split_loop(sc, sy, n_classes, min_leaf, entropy_parent):
+    """Same as _best_split_numpy(), written as a single sweep for numba to compile."""
+    n = len(sc)
+
+    left = np.zeros(n_classes, np.int32)
+    right = np.zeros(n_classes, np.int32)
+    for i in range(n):
+        right[sy[i]] += 1
+
+    best_gain, best_i = MIN_GAIN, -1
+    for i in range(n - 1):
+        left[sy[i]] += 1
+        right[sy[i]] -= 1
+        p_l = i + 1
+        p_r = n - p_l
+        if sc[i] == sc[i + 1] or p_l < min_leaf or p_r < min_leaf:
+            continue
+
+        # same arithmetic as entropy(): H = log2(T) - sum(c * log2(c)) / T
+        clogc_l, clogc_r = 0.0, 0.0
+        for k in range(n_classes):
+            if left[k] > 0:
+                clogc_l += left[k] * np.log2(left[k])
+            if right[k] > 0:
+                clogc_r += right[k] * np.log2(right[k])
+        entropy_l = np.log2(p_l) - clogc_l / p_l
+        entropy_r = np.log2(p_r) - clogc_r / p_r
+        gain = entropy_parent - (p_l * entropy_l + p_r * entropy_r) / n
+        if gain > best_gain:
+            best_gain, best_i = gain, i
+    if best_i < 0:
+        return 0.0, np.nan
+    thres = np.float32((np.float64(sc[best_i]) + np.float64(sc[best_i + 1])) / 2)
+    if thres <= sc[best_i]:
+        thres = sc[best_i + 1]
+    return best_gain, np.float64(thres)
+
+
+if njit is None:
+    best_split = _best_split_numpy
+else:
+    best_split = njit(nogil=True, cache=True)(_best_split_loop)
 
 
 class TreeNodeInterface():
@@ -64,12 +188,13 @@ class DecisionNode(TreeNodeInterface):
         """Classify an example based on its test attribute value.
 
         Args:
-            example: a dictionary { attr name -> value } representing a data instance
+            example: a row of the examples DataFrame (or a dictionary { attr name -> value })
+                representing a data instance
 
         Returns: a class label and probability as tuple
         """
         test_val = example[self.test_attr_name]
-        if test_val is None:
+        if test_val is None or np.isnan(test_val):
             return self.child_miss.classify(example)
         elif test_val < self.test_attr_threshold:
             return self.child_lt.classify(example)
@@ -83,24 +208,36 @@ class DecisionNode(TreeNodeInterface):
 class LeafNode(TreeNodeInterface):
     """Class representing a leaf node of a decision tree.  Holds the predicted class."""
 
-    def __init__(self, pred_class, pred_class_count, total_count):
+    def __init__(self, pred_class_idx, pred_class_count, total_count):
         """Constructor for the leaf node.
 
         Args:
-            pred_class: class label for the majority class that this leaf represents
+            pred_class_idx: index into LABELS of the majority class that this leaf represents
             pred_class_count: number of training instances represented by this leaf node
             total_count: the total number of training instances used to build the leaf node
         """
-        self.pred_class = pred_class
+        self.pred_class_idx = pred_class_idx
         self.pred_class_count = pred_class_count
         self.total_count = total_count
-        self.prob = pred_class_count / total_count  # probability of having the class label
+        # probability of having the class label, quantized to 0..255 (see prob)
+        self.prob_q = np.uint8(round(pred_class_count / total_count * 255))
+
+    @property
+    def pred_class(self):
+        """Class label for the majority class that this leaf represents."""
+        return LABELS[self.pred_class_idx]
+
+    @property
+    def prob(self):
+        """Probability of having the class label, to within 1/510."""
+        return self.prob_q / 255
 
     def classify(self, example):
         """Classify an example.
 
         Args:
-            example: a dictionary { attr name -> value } representing a data instance
+            example: a row of the examples DataFrame (or a dictionary { attr name -> value })
+                representing a data instance
 
         Returns: a class label and probability as tuple as stored in this leaf node.  This will be
             the same for all examples!
@@ -109,7 +246,7 @@ class LeafNode(TreeNodeInterface):
 
     def __str__(self):
         return "leaf {} {}/{}={:.2f}".format(self.pred_class, self.pred_class_count,
-                                             self.total_count, self.prob)
+                                             self.total_count, self.pred_class_count / self.total_count)
 
 
 class DecisionTree:
@@ -119,7 +256,7 @@ class DecisionTree:
         """Constructor for the decision tree model.  Calls learn_tree().
 
         Args:
-            examples: training data to use for tree learning, as a list of dictionaries
+            examples: training data to use for tree learning, as a DataFrame from read_data()
             id_name: the name of an identifier attribute (ignored by learn_tree() function)
             class_name: the name of the class label attribute (assumed categorical)
             min_leaf_count: the minimum number of training examples represented at a leaf node
@@ -128,119 +265,107 @@ class DecisionTree:
         self.class_name = class_name
         self.min_leaf_count = min_leaf_count
 
+        # column-oriented copy of the training data: one contiguous float32 array per numeric
+        # attribute (missing values are nan) and one int8 array of label indices
+        self.attrs = [name for name in examples.columns
+                      if name not in (id_name, class_name) and examples[name].dtype.kind == 'f']
+        self.X = {attr: examples[attr].to_numpy(np.float32) for attr in self.attrs}
+        self.y = np.fromiter((L2I[label] for label in examples[class_name]), dtype=np.int8,
+                             count=len(examples))
+
+        # every attribute is sorted once up front (missing values last); a node reads its own
+        # examples in sorted order by filtering this permutation with its mask
+        self.sorted = {attr: np.argsort(self.X[attr], kind='stable') for attr in self.attrs}
+        self.node_entropy = make_node_entropy(len(LABELS))
+
         # build the tree!
-        self.root = self.learn_tree(examples)
-
-    # Entropy calculation function
-    def entropy(self, dict, total):
-        # 1e-15 for 0 cases
-        total += 1e-15
-        return -(dict['red'] / total * math.log((dict['red'] + 1e-15) / total, 2) +
-                 dict['light blue'] / total * math.log((dict['light blue'] + 1e-15) / total, 2) +
-                 dict['medium blue'] / total * math.log((dict['medium blue'] + 1e-15) / total, 2) +
-                 dict['wicked blue'] / total * math.log((dict['wicked blue'] + 1e-15) / total, 2))
-
-    def learn_tree(self, examples):
+        self.root = self.learn_tree(np.ones(len(examples), dtype=bool))
+        self._compile()
+
+    def learn_tree(self, mask):
         """Build the decision tree based on entropy and information gain.
 
+        Nodes are built from an explicit work stack rather than by recursion, so deep trees
+        don't hit Python's recursion limit.
+
         Args:
-            examples: training data to use for tree learning, as a list of dictionaries.  The
-                attribute stored in self.id_name is ignored, and self.class_name is consided
-                the class label.
+            mask: boolean array over the training examples (rows of self.X and self.y), True
+                for the examples to learn from.  The attribute stored in self.id_name is
+                ignored, and self.class_name is considered the class label.
 
         Returns: a DecisionNode or LeafNode representing the tree
         """
-        #
-        # fill in the function body here!
-        #
-        # Parent entropy
-        parent = {'red': 0, 'light blue': 0, 'medium blue': 0, 'wicked blue': 0}
-        pred_class_count = 0
-        majority = 'red'
-        total = 0
-        for dict in examples:
-            parent[dict[self.class_name]] += 1
-
-            check_count = pred_class_count
-            pred_class_count = max(pred_class_count, parent[dict[self.class_name]])
-            if check_count != pred_class_count:
-                majority = dict[self.class_name]
-
-            total += 1
-        entropy_parent = self.entropy(parent, total)
-
-        # Go through attribute to find the best IG
-        IG, IG_thres = 0, 0
-        minimum_r, minimum_l = 0, 0
-        IG_attr = 'town'  # doesn't need to be town
-        for key in examples[0]:  # keys: attributes, values: values of attributes
-            # Check if attribute is not a place name
-            if (type(examples[0][key]) == float or type(examples[0][key]) is None) and key != self.id_name:
-                # calculate segmentation value
-                bottom = 9999
-                top = -9999
-                for dict in examples:  # List of attribute dict
-                    if type(dict[key]) == float:
-                        bottom = min(dict[key], bottom)
-                        top = max(dict[key], top)
-                seg = (top - bottom) / 25
-
-                # find best IG threshold for each attribute
-                thres = bottom - seg
-                for i in range(25):
-                    p_l, p_r = 0, 0  # probabilities smaller and greater
-
-                    thres += seg
-                    # Calculate IG and entropy of each seg
-                    l = {'red': 0, 'light blue': 0, 'medium blue': 0, 'wicked blue': 0}  # classes smaller
-                    r = {'red': 0, 'light blue': 0, 'medium blue': 0, 'wicked blue': 0}  # classes greater or equal
-                    for dict in examples:
-                        if type(dict[key]) == float:
-                            if dict[key] >= thres:
-                                p_r += 1
-                                r[dict[self.class_name]] += 1
-                            else:
-                                p_l += 1
-                                l[dict[self.class_name]] += 1
-                    if p_r != 0 and p_l != 0:
-                        entropy_l = self.entropy(l, p_l)
-                        entropy_r = self.entropy(r, p_r)
-
-                        # Check minimum leaf count
-                        check = IG
-                        IG = max(IG, entropy_parent -
-                                 (p_l / (p_l + p_r) * entropy_l +
-                                  p_r / (p_l + p_r) * entropy_r))
-                        # if current split is better
-                        if IG != check and (p_l > self.min_leaf_count and p_r > self.min_leaf_count):
-                            IG_thres = thres
-                            IG_attr = key
-                            minimum_l, minimum_r = p_l, p_r
-
-        # if data instances is less then minimum leaf
-        if IG_attr == 'town' or total <= self.min_leaf_count:
-            return LeafNode(majority, pred_class_count, total)
-        # Splitting dataset
-        # create 2 new dicts
-        examples_l = []
-        examples_r = []
-        for dict in examples:
-            if type(dict[IG_attr]) == float:
-                if dict[IG_attr] >= IG_thres:
-                    examples_r.append(dict)
+        root = None
+        stack = [(mask, None, None)]  # (examples at the node, parent node, parent's child attribute)
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            while stack:
+                mask, parent, side = stack.pop()
+                node = self._make_node(mask, executor)
+                if parent is None:
+                    root = node
                 else:
-                    examples_l.append(dict)
+                    setattr(parent, side, node)
+
+                # Splitting dataset; missing values go to neither side
+                if type(node) == DecisionNode:
+                    col = self.X[node.test_attr_name]
+                    stack.append((mask & (col >= node.test_attr_threshold), node, 'child_ge'))
+                    stack.append((mask & (col < node.test_attr_threshold), node, 'child_lt'))
+        return root
+
+    def _make_node(self, mask, executor=None):
+        """Create the node for the examples in mask: a LeafNode, or a DecisionNode whose
+        child_lt and child_ge are left for learn_tree() to fill in.  Nodes with at least
+        PARALLEL_MIN_EXAMPLES examples score their attributes on executor, if given."""
+        n_classes = len(LABELS)
+        y = self.y[mask]
+        total = len(y)
+
+        # Parent class counts and majority class
+        parent = np.bincount(y, minlength=n_classes)
+        majority = int(parent.argmax())
+        pred_class_count = int(parent[majority])
+
+        # a pure node, or one too small to leave min_leaf_count examples on both sides, can't split
+        if pred_class_count == total or total < 2 * self.min_leaf_count:
+            return LeafNode(majority, pred_class_count, total)
 
-        if len(examples_r) > len(examples_l):
-            return DecisionNode(IG_attr, IG_thres, self.learn_tree(examples_l), self.learn_tree(examples_r),
-                                LeafNode(majority, pred_class_count, total))
-        else:
-            return DecisionNode(IG_attr, IG_thres, self.learn_tree(examples_l), self.learn_tree(examples_r),
-                                LeafNode(majority, pred_class_count, total))
+        # Parent entropy
+        entropy_parent = self.node_entropy(parent.tolist(), total)
 
+        # Go through attributes to find the best IG over every split position.  Attributes are
+        # independent, so they can be scored on threads (the numba kernel releases the GIL).
+        def attr_split(attr):
+            return self._attr_split(attr, mask, entropy_parent)
 
+        if executor is not None and total >= PARALLEL_MIN_EXAMPLES:
+            splits = executor.map(attr_split, self.attrs)
+        else:
+            splits = map(attr_split, self.attrs)
 
-        # return None  # fix this line!
+        IG, IG_attr, IG_thres = 0.0, None, None
+        for attr, (gain, thres) in zip(self.attrs, splits):
+            if gain > IG:
+                IG, IG_attr, IG_thres = gain, attr, thres
+
+        # no split gains information while leaving min_leaf_count examples on both sides
+        if IG_attr is None:
+            return LeafNode(majority, pred_class_count, total)
+        return DecisionNode(IG_attr, IG_thres, None, None, LeafNode(majority, pred_class_count, total))
+
+    def _attr_split(self, attr, mask, entropy_parent):
+        """Best split of attr over the examples in mask, as a tuple (gain, threshold)."""
+        idx = self.sorted[attr]
+        local = idx[mask[idx]]
+        sc = self.X[attr][local]
+
+        # missing values sort last, so the present ones are a prefix found by binary search,
+        # and the sorted endpoints tell whether the attribute can be split at all
+        local = local[:np.searchsorted(sc, np.nan)]
+        sc = sc[:len(local)]
+        if len(sc) < 2 or sc[0] == sc[-1]:
+            return 0.0, np.nan
+        return best_split(sc, self.y[local], len(LABELS), self.min_leaf_count, entropy_parent)
 
     def classify(self, example):
         """Perform inference on a single example.
@@ -257,47 +382,117 @@ class DecisionTree:
         return self.root.classify(example)
             # return example[self.class_name], 0.6  # fix this line!
 
+    def classify_many(self, examples):
+        """Perform inference on a whole array of examples at once.
+
+        All examples walk the tree together: at each decision node the rows that reached it
+        are split into less-than, greater-or-equal and missing with array masks.
+
+        Args:
+            examples: a DataFrame of instances, as returned by read_data()
+
+        Returns: a tuple of arrays (class labels, probabilities), one entry per example
+        """
+        out_label = np.empty(len(examples), dtype=np.int8)
+        out_prob = np.empty(len(examples), dtype=np.uint8)
+        stack = [(0, np.arange(len(examples)))]
+        while stack:
+            node, rows = stack.pop()
+            if self.feat_idx[node] < 0:
+                out_label[rows] = self.leaf_label[node]
+                out_prob[rows] = self.leaf_prob[node]
+                continue
+
+            vals = np.asarray(examples[self.attrs[self.feat_idx[node]]])[rows]
+            missing = np.isnan(vals)
+            lt = vals < self.thr[node]
+            for child, child_rows in ((self.lt_child[node], rows[lt]),
+                                      (self.ge_child[node], rows[~lt & ~missing]),
+                                      (self.miss_child[node], rows[missing])):
+                if len(child_rows):
+                    stack.append((child, child_rows))
+        return np.asarray(LABELS)[out_label], out_prob / 255
+
+    def _compile(self):
+        """Flatten the tree into parallel node arrays (node 0 is the root) for classify_many().
+
+        Decision nodes store their attribute index, threshold and child node ids; leaves have
+        feat_idx -1 and store their label index and quantized probability.
+        """
+        nodes = [self.root]
+        for node in nodes:  # breadth-first, nodes grows while iterating
+            if type(node) == DecisionNode:
+                nodes.extend([node.child_lt, node.child_ge, node.child_miss])
+        node_id = {id(node): i for i, node in enumerate(nodes)}
+        attr_idx = {attr: i for i, attr in enumerate(self.attrs)}
+
+        self.feat_idx = np.full(len(nodes), -1, dtype=np.int32)
+        self.thr = np.zeros(len(nodes))
+        self.lt_child = np.zeros(len(nodes), dtype=np.int32)
+        self.ge_child = np.zeros(len(nodes), dtype=np.int32)
+        self.miss_child = np.zeros(len(nodes), dtype=np.int32)
+        self.leaf_label = np.zeros(len(nodes), dtype=np.int8)
+        self.leaf_prob = np.zeros(len(nodes), dtype=np.uint8)
+        for i, node in enumerate(nodes):
+            if type(node) == DecisionNode:
+                self.feat_idx[i] = attr_idx[node.test_attr_name]
+                self.thr[i] = node.test_attr_threshold
+                self.lt_child[i] = node_id[id(node.child_lt)]
+                self.ge_child[i] = node_id[id(node.child_ge)]
+                self.miss_child[i] = node_id[id(node.child_miss)]
+            else:
+                self.leaf_label[i] = node.pred_class_idx
+                self.leaf_prob[i] = node.prob_q
+
     def __str__(self):
         """String representation of tree, calls _ascii_tree()."""
-        ln_bef, ln, ln_aft = self._ascii_tree(self.root)
-        return "\n".join(ln_bef + [ln] + ln_aft)
+        out = io.StringIO()
+        self._ascii_tree(self.root, out, "", "", "")
+        return out.getvalue()[:-1]  # drop the final newline
+
+    def _ascii_tree(self, node, out, prefix_before, prefix_mid, prefix_after):
+        """Super high-tech tree-printing ascii-art madness.
 
-    def _ascii_tree(self, node):
-        """Super high-tech tree-printing ascii-art madness."""
+        Writes the lines for node to out: the lines above the node's own line (its >= subtree)
+        start with prefix_before, its own line with prefix_mid, and the lines below it (its <
+        subtree) with prefix_after.
+        """
         indent = 7  # adjust this to decrease or increase width of output
         if type(node) == LeafNode:
-            return [""], "leaf {} {}/{}={:.2f}".format(node.pred_class, node.pred_class_count, node.total_count,
-                                                       node.prob), [""]
+            out.write(prefix_before + "\n")
+            out.write(prefix_mid + "leaf {} {}/{}={:.2f}\n".format(node.pred_class, node.pred_class_count,
+                                                                   node.total_count,
+                                                                   node.pred_class_count / node.total_count))
+            out.write(prefix_after + "\n")
         else:
-            child_ln_bef, child_ln, child_ln_aft = self._ascii_tree(node.child_ge)
-            lines_before = [" " * indent * 2 + " " + " " * indent + line for line in child_ln_bef]
-            lines_before.append(" " * indent * 2 + u'\u250c' + " >={}----".format(node.test_attr_threshold) + child_ln)
-            lines_before.extend([" " * indent * 2 + "|" + " " * indent + line for line in child_ln_aft])
+            self._ascii_tree(node.child_ge, out,
+                             prefix_before + " " * indent * 2 + " " + " " * indent,
+                             prefix_before + " " * indent * 2 + u'\u250c' + " >={}----".format(node.test_attr_threshold),
+                             prefix_before + " " * indent * 2 + "|" + " " * indent)
 
-            line_mid = node.test_attr_name
+            out.write(prefix_mid + node.test_attr_name + "\n")
 
-            child_ln_bef, child_ln, child_ln_aft = self._ascii_tree(node.child_lt)
-            lines_after = [" " * indent * 2 + "|" + " " * indent + line for line in child_ln_bef]
-            lines_after.append(" " * indent * 2 + u'\u2514' + "- <{}----".format(node.test_attr_threshold) + child_ln)
-            lines_after.extend([" " * indent * 2 + " " + " " * indent + line for line in child_ln_aft])
-
-            return lines_before, line_mid, lines_after
+            self._ascii_tree(node.child_lt, out,
+                             prefix_after + " " * indent * 2 + "|" + " " * indent,
+                             prefix_after + " " * indent * 2 + u'\u2514' + "- <{}----".format(node.test_attr_threshold),
+                             prefix_after + " " * indent * 2 + " " + " " * indent)
 
 
 def confusion4x4(labels, vals):
     """Create an normalized predicted vs. actual confusion matrix for four classes."""
-    n = sum([v for v in vals.values()])
+    idx = {lab: i for i, lab in enumerate(labels)}
+    mat = np.zeros((4, 4))
+    for (actual, pred), count in vals.items():
+        mat[idx[actual], idx[pred]] = count
+    mat /= mat.sum()
+
     abbr = ["".join(w[0] for w in lab.split()) for lab in labels]
-    s = ""
-    s += " actual ___________________________________  \n"
-    for ab, labp in zip(abbr, labels):
-        row = [vals.get((labp, laba), 0) / n for laba in labels]
-        s += "       |        |        |        |        | \n"
-        s += "  {:^4s} | {:5.2f}  | {:5.2f}  | {:5.2f}  | {:5.2f}  | \n".format(ab, *row)
-        s += "       |________|________|________|________| \n"
-    s += "          {:^4s}     {:^4s}     {:^4s}     {:^4s} \n".format(*abbr)
-    s += "                     predicted \n"
-    return s
+    rows = ["       |        |        |        |        | \n"
+            "  {:^4s} | {:5.2f}  | {:5.2f}  | {:5.2f}  | {:5.2f}  | \n"
+            "       |________|________|________|________| \n".format(ab, *row) for ab, row in zip(abbr, mat)]
+    return "".join([" actual ___________________________________  \n"] + rows +
+                   ["          {:^4s}     {:^4s}     {:^4s}     {:^4s} \n".format(*abbr),
+                    "                     predicted \n"])
 
 
 #############################################
@@ -319,24 +514,23 @@ if __name__ == '__main__':
     # test the tree on the test set and see how we did
     correct = 0
     almost = 0  # within one level of correct answer
-    ordering = ['red', 'light blue', 'medium blue', 'wicked blue']  # used to count "almost" right
     test_act_pred = {}
-    for example in test_examples:
-        actual = example[class_attr_name]
-        pred, prob = tree.classify(example)
-        print("{:30} pred {:15} ({:.2f}), actual {:15} {}".format(example[id_attr_name] + ':',
+    preds, probs = tree.classify_many(test_examples)
+    for name, actual, pred, prob in zip(test_examples[id_attr_name], test_examples[class_attr_name],
+                                        preds, probs):
+        print("{:30} pred {:15} ({:.2f}), actual {:15} {}".format(name + ':',
                                                                   "'" + pred + "'", prob,
                                                                   "'" + actual + "'",
                                                                   '*' if pred == actual else ''))
         if pred == actual:
             correct += 1
-        if abs(ordering.index(pred) - ordering.index(actual)) < 2:
+        if abs(L2I[pred] - L2I[actual]) < 2:
             almost += 1
         test_act_pred[(actual, pred)] = test_act_pred.get((actual, pred), 0) + 1
 
     print("\naccuracy: {:.2f}".format(correct / len(test_examples)))
     print("almost:   {:.2f}\n".format(almost / len(test_examples)))
-    print(confusion4x4(['red', 'light blue', 'medium blue', 'wicked blue'], test_act_pred))
+    print(confusion4x4(LABELS, test_act_pred))
     print(tree)  # visualize the tree in sweet, 8-bit text
 
 